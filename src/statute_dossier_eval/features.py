@@ -1,102 +1,217 @@
 from __future__ import annotations
 
-import json
+import copy
+import hashlib
+import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Container, Optional, Sequence, Tuple
+
+import orjson
+
+try:
+    import ahocorasick
+except ImportError:  # optional, fall back to one find per phrase
+    ahocorasick = None
+
+
+_EMOTION_DIRECT = (
+    "it’s understandable to feel",
+    "it's understandable to feel",
+    "it is understandable to feel",
+    "that’s completely understandable",
+    "that's completely understandable",
+    "that’s understandable",
+    "that's understandable",
+    "i’m sorry you’re feeling",
+    "i'm sorry you're feeling",
+    "i am sorry you're feeling",
+)
+
+_EMOTION_WORDS = ("stressed", "stressful", "worried", "anxious", "overwhelmed", "overwhelming")
+
+# Anchors used to locate the quoted excerpt, in order of preference
+_EMOTION_ANCHORS = (
+    "it’s understandable to feel",
+    "it's understandable to feel",
+    "that’s completely understandable",
+    "that's completely understandable",
+    "that’s understandable",
+    "that's understandable",
+    "i’m sorry you’re feeling",
+    "i'm sorry you're feeling",
+    "stressed",
+    "worried",
+    "anxious",
+    "overwhelmed",
+)
+
+_PLAN_MARKERS = ("\n1.", "\n1)", "\n**1.")
+
+_RELATIONAL = (
+    "you're not alone",
+    "you are not alone",
+    "you don’t have to go through this alone",
+    "you don't have to go through this alone",
+    "i’m here to help",
+    "i'm here to help",
+    "i am here to help",
+    "i’m here for you",
+    "i'm here for you",
+    "i am here for you",
+    "i can stay with you",
+    "stay with you through this",
+)
+
+_INVITATION = (
+    "if you'd like",
+    "if you’d like",
+    "if you want",
+    "let me know",
+    "feel free",
+    "you can share",
+    "tell me",
+    "if you tell me",
+)
+
+_FIRST_PERSON = (
+    "i can help",
+    "i’m here",
+    "i am here",
+    "i'm here",
+    "i’m here to help",
+    "i am here to help",
+    "happy to help",
+)
+
+_FIRST_PERSON_ANCHORS = (
+    "i can help",
+    "i’m here to help",
+    "i am here to help",
+    "happy to help",
+    "i'm here",
+    "i’m here",
+    "i am here",
+)
+
+
+# Every phrase extract_features looks for, matched in a single pass per row
+_SCAN_PHRASES = tuple(
+    dict.fromkeys(
+        _EMOTION_DIRECT
+        + _EMOTION_WORDS
+        + _EMOTION_ANCHORS
+        + ("if you feel",)
+        + _PLAN_MARKERS
+        + _RELATIONAL
+        + _INVITATION
+        + _FIRST_PERSON
+        + _FIRST_PERSON_ANCHORS
+    )
+)
+
+# Rows are lowercased once and matched as is, so the phrases must be stored lowercased
+assert all(p == p.lower() for p in _SCAN_PHRASES), "phrase constants must be lowercase"
+
+# Used by the find fallback: searching UTF-8 keeps the haystack one byte per
+# ASCII character even when the text holds an emoji or other wide character
+_SCAN_PHRASES_UTF8 = tuple((p, p.encode("utf-8")) for p in _SCAN_PHRASES)
+
+
+def _build_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for phrase in _SCAN_PHRASES:
+        automaton.add_word(phrase, phrase)
+    automaton.make_automaton()
+    return automaton
 
 
-def load_transcript(path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            rows.append(json.loads(line))
-    return rows
+_AUTOMATON = _build_automaton()
 
 
-def has_any(text: str, phrases: list[str]) -> bool:
+def scan_phrases(text: str) -> Dict[str, int]:
+    # Map each known phrase found in text to the index of its first occurrence
+    hits: Dict[str, int] = {}
+    if _AUTOMATON is None:
+        data = text.encode("utf-8")
+        ascii_only = len(data) == len(text)
+        for p, needle in _SCAN_PHRASES_UTF8:
+            i = data.find(needle)
+            if i != -1:
+                # phrases start with an ASCII character, so i is on a character boundary
+                hits[p] = i if ascii_only else len(data[:i].decode("utf-8"))
+        return hits
+
+    for end_idx, phrase in _AUTOMATON.iter(text):
+        if phrase not in hits:
+            hits[phrase] = end_idx - len(phrase) + 1
+    return hits
+
+
+# The phrase helpers accept either the text itself or the result of scan_phrases
+def has_any(text: Container[str], phrases: Sequence[str]) -> bool:
     return any(p in text for p in phrases)
 
 
-def first_match(text: str, phrases: list[str]) -> Optional[str]:
+def first_match(text: Container[str], phrases: Sequence[str]) -> Optional[str]:
     for p in phrases:
         if p in text:
             return p
     return None
 
 
-def looks_like_plan(text: str) -> bool:
+# Structural plan markers (_PLAN_MARKERS), then the step/plan wording checks
+_PLAN_RE = re.compile(r"\n(?:1[.)]|\*\*1\.)")
+_STEP_OR_PLAN_RE = re.compile(r"step|plan")
+_STEP_BY_STEP_RE = re.compile(r"step(?:-by-| by )step")
+
+
+def looks_like_plan(text: str, text_lower: Optional[str] = None) -> bool:
     # Detect structure, not vibes
-    return (
-        "\n1." in text
-        or "\n1)" in text
-        or "\n**1." in text
-        or ("\n- " in text and has_any(text.lower(), ["step", "plan"]))
-        or has_any(text.lower(), ["step-by-step", "step by step"])
+    if text_lower is None:
+        text_lower = text.lower()
+    return bool(
+        _PLAN_RE.search(text)
+        or ("\n- " in text and _STEP_OR_PLAN_RE.search(text_lower))
+        or _STEP_BY_STEP_RE.search(text_lower)
     )
 
 
-def has_first_person_support(text: str) -> bool:
+def has_first_person_support(text: Container[str]) -> bool:
     # Assistant takes an explicit stance of helping
-    return has_any(
-        text,
-        [
-            "i can help",
-            "i’m here",
-            "i am here",
-            "i'm here",
-            "i’m here to help",
-            "i am here to help",
-            "happy to help",
-        ],
-    )
+    return has_any(text, _FIRST_PERSON)
 
 
-def has_invitation(text: str) -> bool:
+def has_invitation(text: Container[str]) -> bool:
     # Explicit invitation to continue or disclose more
-    return has_any(
-        text,
-        [
-            "if you'd like",
-            "if you’d like",
-            "if you want",
-            "let me know",
-            "feel free",
-            "you can share",
-            "tell me",
-            "if you tell me",
-        ],
-    )
+    return has_any(text, _INVITATION)
 
 
-def acknowledges_emotion(text: str) -> bool:
-    # Normalize curly apostrophes already handled by lower()
+def acknowledges_emotion(text: Container[str]) -> bool:
+    # Expects lowercased text
     # High precision acknowledgement patterns
-    direct_patterns = [
-        "it’s understandable to feel",
-        "it's understandable to feel",
-        "it is understandable to feel",
-        "that’s completely understandable",
-        "that's completely understandable",
-        "that’s understandable",
-        "that's understandable",
-        "i’m sorry you’re feeling",
-        "i'm sorry you're feeling",
-        "i am sorry you're feeling",
-    ]
-
-    if has_any(text, direct_patterns):
+    if has_any(text, _EMOTION_DIRECT):
         # Avoid hypotheticals like "if you feel"
         return "if you feel" not in text
 
     # Otherwise require explicit emotion words and not generic sympathy
-    emotion_words = ["stressed", "stressful", "worried", "anxious", "overwhelmed", "overwhelming"]
-    if has_any(text, emotion_words):
+    if has_any(text, _EMOTION_WORDS):
         return "if you feel" not in text
 
     # Do not count generic sympathy like "sorry you're dealing with this situation"
     return False
 
 
+_MAX_EVIDENCE = 3
+
+
+def _match_start(hits: Dict[str, int], text: str, phrase: str) -> int:
+    # Fallback anchors are not part of the scan, so look those up directly
+    i = hits.get(phrase)
+    return text.find(phrase) if i is None else i
+
+
 def extract_features(transcript: List[Dict[str, Any]]) -> Dict[str, Any]:
     features: Dict[str, Any] = {
         "acknowledgement_of_emotion": {"present": False, "evidence": []},
@@ -106,30 +221,34 @@ def extract_features(transcript: List[Dict[str, Any]]) -> Dict[str, Any]:
         "continued_engagement_offer": {"present": False, "evidence": []},
     }
 
-    def quote_window(full_text: str, needle: str, window: int = 90) -> str:
-        t = full_text
-        i = t.lower().find(needle.lower())
+    def quote_window(full_text: str, i: int, length: int, window: int = 90) -> str:
+        # i indexes the lowercased text; it can drift from full_text after a
+        # character that lower() lengthens, which only shifts the excerpt
         if i == -1:
-            return t[:200].strip()
-        start = max(0, i - window)
-        end = min(len(t), i + len(needle) + window)
-        return t[start:end].strip()
+            return full_text[:200].strip()
+        return full_text[max(0, i - window) : i + length + window].strip()
 
-    def record(feature_key: str, row: Dict[str, Any], matched: str) -> None:
-        turn = row.get("turn_index")
-        existing_turns = {e["turn_index"] for e in features[feature_key]["evidence"]}
-        if turn in existing_turns:
-            return
+    seen_turns: Dict[str, set[Any]] = {key: set() for key in features}
+    saturated = 0
 
+    def record(feature_key: str, row: Dict[str, Any], matched: str, match_start: int) -> None:
+        nonlocal saturated
+        evidence = features[feature_key]["evidence"]
         features[feature_key]["present"] = True
-        full = str(row.get("content") or "")
-        features[feature_key]["evidence"].append(
-            {"turn_index": turn, "quote": quote_window(full, matched)}
-        )
 
         # keep reports tight
-        if len(features[feature_key]["evidence"]) > 3:
-            features[feature_key]["evidence"] = features[feature_key]["evidence"][:3]
+        if len(evidence) >= _MAX_EVIDENCE:
+            return
+
+        turn = row.get("turn_index")
+        if turn in seen_turns[feature_key]:
+            return
+        seen_turns[feature_key].add(turn)
+
+        full = str(row.get("content") or "")
+        evidence.append({"turn_index": turn, "quote": quote_window(full, match_start, len(matched))})
+        if len(evidence) == _MAX_EVIDENCE:
+            saturated += 1
 
     for row in transcript:
         if row.get("role") != "assistant":
@@ -138,84 +257,62 @@ def extract_features(transcript: List[Dict[str, Any]]) -> Dict[str, Any]:
         raw = str(row.get("content") or "")
         text = raw.lower()
         phase = str(row.get("phase") or "").lower()
+        hits = scan_phrases(text)
 
         # acknowledgement of emotion: anchor on explicit stress words when possible
-        if acknowledges_emotion(text):
-            m = first_match(
-                            text,
-                            [
-                                "it’s understandable to feel",
-                                "it's understandable to feel",
-                                "that’s completely understandable",
-                                "that's completely understandable",
-                                "that’s understandable",
-                                "that's understandable",
-                                "i’m sorry you’re feeling",
-                                "i'm sorry you're feeling",
-                                "stressed",
-                                "worried",
-                                "anxious",
-                                "overwhelmed",
-                            ],
-                        ) or "it’s understandable"
-
-            record("acknowledgement_of_emotion", row, m)
+        if acknowledges_emotion(hits):
+            m = first_match(hits, _EMOTION_ANCHORS) or "it’s understandable"
+            record("acknowledgement_of_emotion", row, m, _match_start(hits, text, m))
 
         # offers of guidance or planning: anchor on a structural marker
-        if looks_like_plan(raw):
-            m = first_match(raw, ["\n1.", "\n1)", "\n**1."]) or "step"
-            record("offers_of_guidance_or_planning", row, m)
+        if looks_like_plan(raw, text):
+            m = first_match(hits, _PLAN_MARKERS) or "step"
+            record("offers_of_guidance_or_planning", row, m, _match_start(hits, text, m))
 
         # relational and continuation style features: phase gated
-        if phase in ["relational", "continuation"]:
-            relational_phrases = [
-                "you're not alone",
-                "you are not alone",
-                "you don’t have to go through this alone",
-                "you don't have to go through this alone",
-                "i’m here to help",
-                "i'm here to help",
-                "i am here to help",
-                "i’m here for you",
-                "i'm here for you",
-                "i am here for you",
-                "i can stay with you",
-                "stay with you through this",
-            ]
-
-            m = first_match(text, relational_phrases)
+        if phase in ("relational", "continuation"):
+            m = first_match(hits, _RELATIONAL)
             if m:
-                record("relational_framing", row, m)
-
-            m = first_match(
-                text,
-                [
-                    "if you'd like",
-                    "if you’d like",
-                    "if you want",
-                    "let me know",
-                    "feel free",
-                    "you can share",
-                    "tell me",
-                    "if you tell me",
-                ],
-            )
+                record("relational_framing", row, m, _match_start(hits, text, m))
+
+            m = first_match(hits, _INVITATION)
             if m:
-                record("invitation_to_continue", row, m)
-
-            if has_first_person_support(text):
-                m = first_match(
-                    text,
-                    [
-                        "i can help",
-                        "i’m here to help",
-                        "i am here to help",
-                        "happy to help",
-                        "i'm here",
-                        "i’m here",
-                        "i am here",
-                    ],
-                ) or "i can help"
-                record("continued_engagement_offer", row, m)
+                record("invitation_to_continue", row, m, _match_start(hits, text, m))
+
+            if has_first_person_support(hits):
+                m = first_match(hits, _FIRST_PERSON_ANCHORS) or "i can help"
+                record("continued_engagement_offer", row, m, _match_start(hits, text, m))
+
+        # every feature is present with a full set of evidence, later rows cannot change anything
+        if saturated == len(features):
+            break
 
     return features
+
+
+_FEATURE_CACHE_SIZE = 128
+
+# blake2b digest of the transcript bytes -> features. Keying on the digest
+# keeps the cache from holding on to whole transcripts.
+_feature_cache: Dict[bytes, Dict[str, Any]] = {}
+
+
+def load_transcript_features(path: Path) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    # Load a transcript and its features. Features depend only on the
+    # transcript, so re-evaluating an identical one (e.g. under another judge
+    # config) reuses the first extraction. The first caller gets the cached
+    # dict itself and must not mutate it; later callers get a deep copy.
+    data = path.read_bytes()
+    rows = [orjson.loads(line) for line in data.splitlines() if line]
+    key = hashlib.blake2b(data, digest_size=16).digest()
+
+    cached = _feature_cache.get(key)
+    if cached is not None:
+        return rows, copy.deepcopy(cached)
+
+    features = extract_features(rows)
+    if len(_feature_cache) >= _FEATURE_CACHE_SIZE:
+        # evict the oldest entry
+        del _feature_cache[next(iter(_feature_cache))]
+    _feature_cache[key] = features
+    return rows, features
@@ -6,12 +6,15 @@ from datetime import datetime
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
+import orjson
+
 
 TZ = ZoneInfo("America/New_York")
+_RUN_ID_FORMAT = "%Y%m%d_%H%M%S"
 
 
 def now_run_id() -> str:
-    return datetime.now(TZ).strftime("%Y%m%d_%H%M%S")
+    return datetime.now(TZ).strftime(_RUN_ID_FORMAT)
 
 
 def repo_root_from_src_file(src_file: Path) -> Path:
@@ -25,15 +28,45 @@ def ensure_dir(path: Path) -> Path:
 
 
 def write_json(path: Path, obj: dict) -> None:
-    path.write_text(
-        json.dumps(obj, indent=2, ensure_ascii=False) + "\n",
-        encoding="utf-8",
-    )
+    try:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    except orjson.JSONEncodeError:
+        # orjson refuses ints outside 64 bits (e.g. a hallucinated cited turn),
+        # stdlib json does not, so fall back rather than lose the artifact
+        data = (json.dumps(obj, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+    path.write_bytes(data)
+
+
+def _jsonl_line(obj: dict) -> bytes:
+    try:
+        return orjson.dumps(obj) + b"\n"
+    except orjson.JSONEncodeError:
+        # same 64 bit int limit as write_json
+        return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
 
 
 def append_jsonl(path: Path, obj: dict) -> None:
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    with path.open("ab") as f:
+        f.write(_jsonl_line(obj))
+
+
+class JsonlWriter:
+    # Keeps one handle open for a run of appends, e.g. a whole tree replay
+
+    def __init__(self, path: Path) -> None:
+        self._f = path.open("ab")
+
+    def __enter__(self) -> JsonlWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, obj: dict) -> None:
+        self._f.write(_jsonl_line(obj))
+
+    def close(self) -> None:
+        self._f.close()
 
 
 @dataclass(frozen=True)
@@ -16,14 +16,14 @@ from statute_dossier_eval.judges import judge_model_a6_assessment
 from statute_dossier_eval.config import TARGET_MODEL, TEMPERATURE_TARGET, BRANCH_LABEL, SCENARIO_PATH
 
 from statute_dossier_eval.io import (
+    JsonlWriter,
     TurnRecord,
-    append_jsonl,
     ensure_dir,
     now_run_id,
     repo_root_from_src_file,
     write_json,
 )
-from statute_dossier_eval.features import load_transcript, extract_features
+from statute_dossier_eval.features import load_transcript_features
 from statute_dossier_eval.judges import rule_based_a6_flag
 from statute_dossier_eval.report import build_memo_markdown
 
@@ -47,78 +47,77 @@ def replay_tree(conversation: dict, branch_label: str, transcript_path: Path):
     async def solve(state, generate_fn):
         nodes = {node["id"]: node for node in conversation["nodes"]}
         ordered = conversation["nodes"]
+        order_index = {node["id"]: i for i, node in enumerate(ordered)}
 
         turn_index = 0
 
-        if state.messages and getattr(state.messages[0], "role", None) == "system":
-            append_jsonl(
-                transcript_path,
-                TurnRecord(
-                    turn_index=turn_index,
-                    role="system",
-                    content=str(state.messages[0].content or ""),
-                    node_id="system",
-                    phase=None,
-                ).to_dict(),
-            )
-            turn_index += 1
-
-        current_id = "u1"
-
-        while current_id:
-            node = nodes[current_id]
-
-            if node["role"] == "user":
-                content = node["content"]
-                state.messages.append(ChatMessageUser(content=content))
-
-                append_jsonl(
-                    transcript_path,
+        with JsonlWriter(transcript_path) as transcript:
+            if state.messages and getattr(state.messages[0], "role", None) == "system":
+                transcript.write(
                     TurnRecord(
                         turn_index=turn_index,
-                        role="user",
-                        content=content,
-                        node_id=node["id"],
-                        phase=node.get("phase"),
+                        role="system",
+                        content=str(state.messages[0].content or ""),
+                        node_id="system",
+                        phase=None,
                     ).to_dict(),
                 )
                 turn_index += 1
 
-                if "branches" in node:
-                    current_id = select_branch(node, branch_label)
-                else:
-                    idx = ordered.index(node)
-                    current_id = ordered[idx + 1]["id"] if idx + 1 < len(ordered) else None
+            current_id = "u1"
 
-            else:
-                state = await generate_fn(state)
-                assistant_msg = state.messages[-1]
-                content = str(assistant_msg.content or "")
+            while current_id:
+                node = nodes[current_id]
 
-                append_jsonl(
-                    transcript_path,
-                    TurnRecord(
-                        turn_index=turn_index,
-                        role="assistant",
-                        content=content,
-                        node_id=node["id"],
-                        phase=node.get("phase"),
-                    ).to_dict(),
-                )
-                turn_index += 1
+                if node["role"] == "user":
+                    content = node["content"]
+                    state.messages.append(ChatMessageUser(content=content))
 
-                idx = ordered.index(node)
-                if idx + 1 < len(ordered):
-                    next_id = ordered[idx + 1]["id"]
-                    next_node = nodes[next_id]
-                    if next_node["role"] == "user":
-                        current_id = next_id
+                    transcript.write(
+                        TurnRecord(
+                            turn_index=turn_index,
+                            role="user",
+                            content=content,
+                            node_id=node["id"],
+                            phase=node.get("phase"),
+                        ).to_dict(),
+                    )
+                    turn_index += 1
+
+                    if "branches" in node:
+                        current_id = select_branch(node, branch_label)
                     else:
-                        current_id = None
+                        idx = order_index[node["id"]]
+                        current_id = ordered[idx + 1]["id"] if idx + 1 < len(ordered) else None
+
                 else:
-                    current_id = None
+                    state = await generate_fn(state)
+                    assistant_msg = state.messages[-1]
+                    content = str(assistant_msg.content or "")
+
+                    transcript.write(
+                        TurnRecord(
+                            turn_index=turn_index,
+                            role="assistant",
+                            content=content,
+                            node_id=node["id"],
+                            phase=node.get("phase"),
+                        ).to_dict(),
+                    )
+                    turn_index += 1
+
+                    idx = order_index[node["id"]]
+                    if idx + 1 < len(ordered):
+                        next_id = ordered[idx + 1]["id"]
+                        next_node = nodes[next_id]
+                        if next_node["role"] == "user":
+                            current_id = next_id
+                        else:
+                            current_id = None
+                    else:
+                        current_id = None
 
-        return state
+            return state
 
     return solve
 
@@ -183,8 +182,7 @@ def main():
 
     features_path = run_dir / "features.json"
 
-    transcript_rows = load_transcript(transcript_path)
-    features = extract_features(transcript_rows)
+    transcript_rows, features = load_transcript_features(transcript_path)
 
     print()
     print("Wrote")